@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Tuple
 
@@ -17,6 +18,14 @@ try:
 except Exception:
     _HAS_RDKIT = False
 
+# optional PyArrow for multithreaded CSV parsing and writing
+try:
+    import pyarrow as pa  # type: ignore[reportMissingImports]
+    import pyarrow.csv as pacsv  # type: ignore[reportMissingImports]
+    _HAS_PYARROW = True
+except Exception:
+    _HAS_PYARROW = False
+
 
 WORKSPACE = Path(__file__).resolve().parents[1]
 
@@ -31,78 +40,85 @@ OUTPUT_JSON = WORKSPACE / "processed_dataset.json"
 OUTPUT_FEATURES = WORKSPACE / "feature_description.txt"
 OUTPUT_REPORT = WORKSPACE / "data_quality_report.txt"
 
+_RE_PUNCT = re.compile(r"[^\w\s]")
+_RE_CAMEL = re.compile(r"([a-z0-9])([A-Z])")
+_RE_WS = re.compile(r"[\s\-]+")
+_RE_UND = re.compile(r"_+")
+
 
+@lru_cache(maxsize=1024)
 def to_snake_case(name: str) -> str:
+    # Already snake_case (e.g. the final pass over the combined frame): nothing to rewrite.
+    if (
+        name.islower()
+        and all(ch.isalnum() or ch == "_" for ch in name)
+        and "__" not in name
+        and not name.startswith("_")
+        and not name.endswith("_")
+    ):
+        return name
     name = name.strip()
-    name = re.sub(r"[^\w\s]", " ", name)
-    name = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", name)
-    name = re.sub(r"[\s\-]+", "_", name)
-    name = re.sub(r"_+", "_", name)
+    name = _RE_PUNCT.sub(" ", name)
+    name = _RE_CAMEL.sub(r"\1_\2", name)
+    name = _RE_WS.sub("_", name)
+    name = _RE_UND.sub("_", name)
     return name.strip("_").lower()
 
 
 def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+    # Shallow copy: new column labels without duplicating the data.
+    df = df.copy(deep=False)
     df.columns = [to_snake_case(c) for c in df.columns]
     return df
 
 
 def profile_dataframe(df: pd.DataFrame, name: str) -> Dict[str, object]:
     num_df = df.select_dtypes(include=[np.number])
-    outlier_counts: Dict[str, int] = {}
-    for col in num_df.columns:
-        series = num_df[col].dropna()
-        if series.empty:
-            outlier_counts[col] = 0
-            continue
-        q1 = series.quantile(0.25)
-        q3 = series.quantile(0.75)
-        iqr = q3 - q1
-        if iqr == 0:
-            outlier_counts[col] = 0
-            continue
-        lo = q1 - 1.5 * iqr
-        hi = q3 + 1.5 * iqr
-        outlier_counts[col] = int(((series < lo) | (series > hi)).sum())
-
+    qs = num_df.quantile([0.25, 0.75])
+    q1 = qs.loc[0.25]
+    q3 = qs.loc[0.75]
+    iqr = q3 - q1
+    outside = num_df.lt(q1 - 1.5 * iqr, axis=1) | num_df.gt(q3 + 1.5 * iqr, axis=1)
+    # Constant columns have no spread to judge against; all-NaN columns never compare true.
+    counts = outside.sum().where(iqr != 0, 0)
+    outlier_counts: Dict[str, int] = {col: int(counts[col]) for col in num_df.columns}
+
+    null_by_col = df.isna().sum()
     return {
         "dataset": name,
         "rows": int(df.shape[0]),
         "columns": int(df.shape[1]),
         "column_names": list(df.columns),
         "dtypes": {k: str(v) for k, v in df.dtypes.items()},
-        "missing_by_column": {k: int(v) for k, v in df.isna().sum().items()},
-        "total_missing": int(df.isna().sum().sum()),
+        "missing_by_column": {k: int(v) for k, v in null_by_col.items()},
+        "total_missing": int(null_by_col.sum()),
         "duplicate_rows": int(df.duplicated().sum()),
         "outliers_iqr": outlier_counts,
     }
 
 
 def clip_numeric_outliers(df: pd.DataFrame, ignore_cols: List[str] | None = None) -> pd.DataFrame:
-    df = df.copy()
+    # Clips in place; callers pass a frame they own and use the return value.
     ignore_cols = set(ignore_cols or [])
     num_cols = [c for c in df.select_dtypes(include=[np.number]).columns if c not in ignore_cols]
-    for col in num_cols:
-        s = df[col]
-        if s.dropna().empty:
-            continue
-        q1 = s.quantile(0.01)
-        q99 = s.quantile(0.99)
-        if pd.isna(q1) or pd.isna(q99):
-            continue
-        if q1 == q99:
-            continue
-        df[col] = s.clip(lower=q1, upper=q99)
+    if not num_cols:
+        return df
+    qs = df[num_cols].quantile([0.01, 0.99])
+    lower = qs.loc[0.01]
+    upper = qs.loc[0.99]
+    # Skip all-NaN and constant columns.
+    valid_cols = [c for c in num_cols if pd.notna(lower[c]) and pd.notna(upper[c]) and lower[c] != upper[c]]
+    if valid_cols:
+        df[valid_cols] = df[valid_cols].clip(lower=lower[valid_cols], upper=upper[valid_cols], axis=1)
     return df
 
 
-def minmax(series: pd.Series) -> pd.Series:
-    s = pd.to_numeric(series, errors="coerce")
-    mn = s.min(skipna=True)
-    mx = s.max(skipna=True)
-    if pd.isna(mn) or pd.isna(mx) or mn == mx:
-        return pd.Series(np.zeros(len(s)), index=s.index)
-    return (s - mn) / (mx - mn)
+def minmax(a: np.ndarray) -> np.ndarray:
+    # Column-wise; fmin/fmax skip NaN. All-NaN and constant columns scale to zeros.
+    mn = np.fmin.reduce(a, axis=0, initial=np.inf)
+    mx = np.fmax.reduce(a, axis=0, initial=-np.inf)
+    scaled = mx > mn
+    return np.where(scaled, (a - mn) / np.where(scaled, mx - mn, 1.0), 0.0)
 
 
 def compute_lipinski_ratio(df: pd.DataFrame) -> pd.Series:
@@ -131,7 +147,7 @@ def compute_lipinski_ratio(df: pd.DataFrame) -> pd.Series:
 
 def prepare_pubchem(df: pd.DataFrame) -> pd.DataFrame:
     df = normalize_columns(df)
-    df = df.drop_duplicates().copy()
+    df = df.drop_duplicates()
 
     string_cols = df.select_dtypes(include=["object"]).columns
     for col in string_cols:
@@ -139,8 +155,9 @@ def prepare_pubchem(df: pd.DataFrame) -> pd.DataFrame:
 
     if "create_date" in df.columns:
         # Convert YYYYMMDD integer/date-like strings to ISO date for web compatibility.
-        date_str = df["create_date"].astype(str).str.replace(r"\.0$", "", regex=True)
-        dt = pd.to_datetime(date_str, format="%Y%m%d", errors="coerce")
+        date_num = pd.to_numeric(df["create_date"], errors="coerce")
+        date_num = date_num.where(date_num % 1 == 0).astype("Int64")
+        dt = pd.to_datetime(date_num, format="%Y%m%d", errors="coerce")
         df["create_date"] = dt.dt.strftime("%Y-%m-%d")
 
     df = clip_numeric_outliers(df, ignore_cols=["compound_cid"])
@@ -161,7 +178,7 @@ def prepare_pubchem(df: pd.DataFrame) -> pd.DataFrame:
         "charge",
     ]
     keep_cols = [c for c in keep_cols if c in df.columns]
-    out = df[keep_cols].copy()
+    out = df.reindex(columns=keep_cols)
 
     out["source_dataset"] = "pubchem_antibiotic"
     out["candidate_id"] = "pubchem_" + out["compound_cid"].astype(str)
@@ -176,7 +193,7 @@ def prepare_pubchem(df: pd.DataFrame) -> pd.DataFrame:
 
 def prepare_delaney(df: pd.DataFrame) -> pd.DataFrame:
     df = normalize_columns(df)
-    df = df.drop_duplicates().copy()
+    df = df.drop_duplicates()
 
     col_map = {
         "compound_id": "name",
@@ -187,9 +204,7 @@ def prepare_delaney(df: pd.DataFrame) -> pd.DataFrame:
         "esol_predicted_log_solubility_in_mols_per_litre": "predicted_log_solubility",
         "minimum_degree": "minimum_degree",
     }
-    for src, tgt in col_map.items():
-        if src in df.columns and src != tgt:
-            df = df.rename(columns={src: tgt})
+    df = df.rename(columns={src: tgt for src, tgt in col_map.items() if src != tgt})
 
     df = clip_numeric_outliers(df)
 
@@ -205,7 +220,7 @@ def prepare_delaney(df: pd.DataFrame) -> pd.DataFrame:
         "minimum_degree",
     ]
     keep_cols = [c for c in keep_cols if c in df.columns]
-    out = df[keep_cols].copy()
+    out = df.reindex(columns=keep_cols)
 
     out["source_dataset"] = "delaney_solubility"
     out["candidate_id"] = "delaney_" + out.index.astype(str)
@@ -216,18 +231,18 @@ def prepare_delaney(df: pd.DataFrame) -> pd.DataFrame:
 
 def prepare_quantum(df: pd.DataFrame) -> pd.DataFrame:
     df = normalize_columns(df)
-    df = df.drop_duplicates().copy()
+    df = df.drop_duplicates()
 
-    for col in ["binding_score", "toxicity", "stability", "solubility"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce").clip(0, 1)
+    unit_cols = [c for c in ["binding_score", "toxicity", "stability", "solubility"] if c in df.columns]
+    if unit_cols:
+        block = df[unit_cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        df[unit_cols] = np.clip(block, 0.0, 1.0)
 
-    out = df.copy()
-    out["source_dataset"] = "quantum_candidates"
-    out["candidate_id"] = out.get("molecule_id", pd.Series(range(len(out)))).astype(str)
-    out["name"] = out.get("molecule_id", pd.Series(["unknown"] * len(out))).astype(str)
-    out["smiles"] = "unknown"
-    return out
+    df["source_dataset"] = "quantum_candidates"
+    df["candidate_id"] = df.get("molecule_id", pd.Series(range(len(df)))).astype(str)
+    df["name"] = df.get("molecule_id", pd.Series(["unknown"] * len(df))).astype(str)
+    df["smiles"] = "unknown"
+    return df
 
 
 def harmonize_and_engineer(dfs: List[pd.DataFrame]) -> pd.DataFrame:
@@ -262,11 +277,7 @@ def harmonize_and_engineer(dfs: List[pd.DataFrame]) -> pd.DataFrame:
             combined["xlogp"] = np.nan
 
         def compute_logp_from_smiles(smiles: str) -> float:
-            if not _HAS_RDKIT:
-                return np.nan
             try:
-                if pd.isna(smiles) or not isinstance(smiles, str) or smiles.strip().lower() in {"", "unknown", "nan"}:
-                    return np.nan
                 m = Chem.MolFromSmiles(smiles)
                 if m is None:
                     return np.nan
@@ -278,36 +289,43 @@ def harmonize_and_engineer(dfs: List[pd.DataFrame]) -> pd.DataFrame:
         # Only attempt compute when SMILES present and RDKit is available.
         if missing_logp.any():
             if _HAS_RDKIT:
-                combined.loc[missing_logp, "xlogp"] = (
-                    combined.loc[missing_logp, "smiles"].apply(compute_logp_from_smiles)
-                )
+                # Parse each distinct SMILES once; duplicates are common across sources.
+                # Placeholders and non-strings are screened once over the distinct keys
+                # and left out of the cache, so they map to NaN.
+                smiles = combined.loc[missing_logp, "smiles"]
+                keys = pd.Series(pd.unique(smiles.to_numpy()), dtype=object)
+                keys = keys[keys.map(lambda s: isinstance(s, str))]
+                norm = keys.str.strip().str.lower()
+                valid = keys[~norm.isin(["", "unknown", "nan"])]
+                cache = {s: compute_logp_from_smiles(s) for s in valid}
+                combined.loc[missing_logp, "xlogp"] = smiles.map(cache)
             else:
                 # RDKit not available: apply a lightweight heuristic to estimate logP
-                def heuristic_logp(row: pd.Series) -> float:
-                    try:
-                        mw = float(row.get("molecular_weight") or 0.0)
-                        pa = float(row.get("polar_area") or 0.0)
-                    except Exception:
-                        return np.nan
-                    # baseline near 2.0, increase with MW, decrease with polar area
-                    est = 2.0 + (mw - 350.0) / 250.0 - (pa - 50.0) / 200.0
-                    return float(np.clip(est, -2.0, 6.0))
-
-                try:
-                    combined.loc[missing_logp, "xlogp"] = (
-                        combined.loc[missing_logp].apply(heuristic_logp, axis=1)
-                    )
-                except Exception:
-                    combined.loc[missing_logp, "xlogp"] = np.nan
-    for col in numeric_candidates:
-        if col in combined.columns:
-            combined[col] = pd.to_numeric(combined[col], errors="coerce")
+                def heuristic_input(col: str) -> np.ndarray:
+                    if col not in combined.columns:
+                        return np.zeros(int(missing_logp.sum()))
+                    values = pd.to_numeric(combined.loc[missing_logp, col], errors="coerce")
+                    return values.to_numpy(dtype=np.float64)
+
+                mw = heuristic_input("molecular_weight")
+                psa = heuristic_input("polar_area")
+                # baseline near 2.0, increase with MW, decrease with polar area
+                est = np.clip(2.0 + (mw - 350.0) / 250.0 - (psa - 50.0) / 200.0, -2.0, 6.0)
+                combined.loc[missing_logp, "xlogp"] = est
+    # Columns that already parsed as numbers need no coercion.
+    to_coerce = [
+        c for c in numeric_candidates if c in combined.columns and not pd.api.types.is_numeric_dtype(combined[c])
+    ]
+    if to_coerce:
+        combined[to_coerce] = combined[to_coerce].apply(pd.to_numeric, errors="coerce")
 
     # Critical text fields.
     for col in ["candidate_id", "source_dataset", "name", "smiles"]:
         if col not in combined.columns:
             combined[col] = "unknown"
         combined[col] = combined[col].astype(str).fillna("unknown")
+    # One label per source; comparisons below then run on the integer codes.
+    combined["source_dataset"] = combined["source_dataset"].astype("category")
 
     # Impute critical numeric columns with robust medians.
     critical_numeric = [
@@ -325,45 +343,59 @@ def harmonize_and_engineer(dfs: List[pd.DataFrame]) -> pd.DataFrame:
     for col in critical_numeric:
         if col not in combined.columns:
             combined[col] = np.nan
-        median_val = pd.to_numeric(combined[col], errors="coerce").median(skipna=True)
-        if pd.isna(median_val):
-            median_val = 0.0
-        combined[col] = pd.to_numeric(combined[col], errors="coerce").fillna(median_val)
+    # All critical columns are numeric by now; impute them as one (N, K) block.
+    block = combined[critical_numeric].to_numpy(dtype=np.float64, na_value=np.nan)
+    medians = combined[critical_numeric].median(skipna=True).fillna(0.0).to_numpy(dtype=np.float64)
+    combined[critical_numeric] = np.where(np.isnan(block), medians, block)
 
     # Additional inferred solubility from Delaney when direct solubility absent before imputation.
     if "measured_log_solubility" in combined.columns:
-        measured_scaled = minmax(combined["measured_log_solubility"])
+        measured_scaled = minmax(combined["measured_log_solubility"].to_numpy(dtype=np.float64, na_value=np.nan))
         combined["solubility"] = np.where(
             combined["source_dataset"] == "delaney_solubility",
             measured_scaled,
             combined["solubility"],
         )
 
-    lipinski_ratio = compute_lipinski_ratio(combined)
+    lipinski_ratio = compute_lipinski_ratio(combined).to_numpy(dtype=np.float64)
 
-    # Normalized helper features
-    binding_norm = minmax(combined["binding_score"])
-    stability_norm = minmax(combined["stability"])
-    solubility_norm = minmax(combined["solubility"])
-    toxicity_norm = minmax(combined["toxicity"])
-    complexity_norm = minmax(combined["complexity"])
-    heavy_atom_norm = minmax(combined["heavy_atom_count"] if "heavy_atom_count" in combined.columns else pd.Series(0, index=combined.index))
-    rotatable_norm = minmax(combined["rotatable_bond_count"])
+    # Normalized helper features, min-max scaled as one (N, 7) block.
+    norm_cols = [
+        "binding_score",
+        "stability",
+        "solubility",
+        "toxicity",
+        "complexity",
+        "heavy_atom_count",
+        "rotatable_bond_count",
+    ]
+    block = combined.reindex(columns=norm_cols, fill_value=0.0).to_numpy(dtype=np.float64, na_value=np.nan)
+    norm = minmax(block)
+    binding_norm, stability_norm, solubility_norm, toxicity_norm, complexity_norm, heavy_atom_norm, rotatable_norm = norm.T
 
     # Engineered features
-    combined["efficacy_index"] = (0.6 * binding_norm + 0.2 * stability_norm + 0.2 * solubility_norm).clip(0, 1)
-    combined["safety_index"] = (0.7 * (1 - toxicity_norm) + 0.3 * lipinski_ratio).clip(0, 1)
-    combined["molecular_complexity"] = (0.5 * complexity_norm + 0.3 * heavy_atom_norm + 0.2 * rotatable_norm).clip(0, 1)
+    efficacy_index = np.clip(0.6 * binding_norm + 0.2 * stability_norm + 0.2 * solubility_norm, 0, 1)
+    safety_index = np.clip(0.7 * (1 - toxicity_norm) + 0.3 * lipinski_ratio, 0, 1)
+    molecular_complexity = np.clip(0.5 * complexity_norm + 0.3 * heavy_atom_norm + 0.2 * rotatable_norm, 0, 1)
+
+    complexity_balance = np.clip(1 - np.abs(molecular_complexity - 0.5) * 2, 0, 1)
+    drug_score = np.clip(
+        0.45 * efficacy_index
+        + 0.35 * safety_index
+        + 0.20 * complexity_balance,
+        0,
+        1,
+    )
 
-    complexity_balance = (1 - (combined["molecular_complexity"] - 0.5).abs() * 2).clip(0, 1)
-    combined["drug_score"] = (
-        0.45 * combined["efficacy_index"]
-        + 0.35 * combined["safety_index"]
-        + 0.20 * complexity_balance
-    ).clip(0, 1)
+    combined["efficacy_index"] = efficacy_index
+    combined["safety_index"] = safety_index
+    combined["molecular_complexity"] = molecular_complexity
+    combined["drug_score"] = drug_score
 
-    combined = combined.sort_values("drug_score", ascending=False).reset_index(drop=True)
-    combined["priority_rank"] = np.arange(1, len(combined) + 1)
+    # Stable descending order: tied scores keep their source order.
+    order = np.argsort(-combined["drug_score"].to_numpy(), kind="stable")
+    combined = combined.iloc[order].reset_index(drop=True)
+    combined["priority_rank"] = np.arange(1, len(combined) + 1, dtype=np.int32)
 
     # Frontend-friendly compact schema.
     final_cols = [
@@ -391,13 +423,25 @@ def harmonize_and_engineer(dfs: List[pd.DataFrame]) -> pd.DataFrame:
         if col not in combined.columns:
             combined[col] = np.nan if col not in {"candidate_id", "source_dataset", "name", "smiles"} else "unknown"
 
-    final_df = combined[final_cols].copy()
+    final_df = combined.reindex(columns=final_cols)
 
     # Enforce types for web compatibility.
     float_cols = [c for c in final_cols if c not in {"candidate_id", "source_dataset", "name", "smiles", "priority_rank"}]
     for col in float_cols:
         final_df[col] = pd.to_numeric(final_df[col], errors="coerce").fillna(0.0).round(6)
-    final_df["priority_rank"] = pd.to_numeric(final_df["priority_rank"], errors="coerce").fillna(0).astype(int)
+    # Scores bounded to [0, 1] keep all six decimals in float32; descriptors stay float64.
+    unit_cols = [
+        "binding_score",
+        "toxicity",
+        "stability",
+        "solubility",
+        "efficacy_index",
+        "safety_index",
+        "molecular_complexity",
+        "drug_score",
+    ]
+    final_df[unit_cols] = final_df[unit_cols].astype(np.float32)
+    final_df["priority_rank"] = pd.to_numeric(final_df["priority_rank"], errors="coerce").fillna(0).astype(np.int32)
 
     return final_df
 
@@ -488,12 +532,22 @@ def generate_quality_report(
     report_path.write_text("\n".join(lines), encoding="utf-8")
 
 
+def read_input_csv(path: Path) -> pd.DataFrame:
+    if not _HAS_PYARROW:
+        return pd.read_csv(path)
+    try:
+        return pd.read_csv(path, engine="pyarrow")
+    except (pd.errors.ParserError, pa.lib.ArrowInvalid):
+        # PyArrow is stricter than the C engine (e.g. short rows); let the C engine pad them with NaN.
+        return pd.read_csv(path)
+
+
 def main() -> None:
     raw: Dict[str, pd.DataFrame] = {}
     initial_profiles: List[Dict[str, object]] = []
     for name, path in INPUT_FILES.items():
         try:
-            df = pd.read_csv(path)
+            df = read_input_csv(path)
             raw[name] = df
         except Exception:
             # missing or unreadable input — create empty dataframe and note in profile
@@ -506,8 +560,14 @@ def main() -> None:
 
     final_df = harmonize_and_engineer([pubchem, delaney, quantum])
 
-    final_df.to_csv(OUTPUT_CSV, index=False)
-    OUTPUT_JSON.write_text(final_df.to_json(orient="records", force_ascii=False), encoding="utf-8")
+    if _HAS_PYARROW:
+        pacsv.write_csv(pa.Table.from_pandas(final_df, preserve_index=False), OUTPUT_CSV)
+    else:
+        final_df.to_csv(OUTPUT_CSV, index=False)
+    OUTPUT_JSON.write_text(
+        final_df.to_json(orient="records", force_ascii=False, double_precision=6),
+        encoding="utf-8",
+    )
     generate_feature_description(OUTPUT_FEATURES)
     generate_quality_report(initial_profiles, final_df, OUTPUT_REPORT)
 